@@ -7,7 +7,8 @@ import logging
 import argparse
 
 from src.analyzer import StockAnalyzer, SimplifiedAnalyzer
-from src.report_generator import ReportGenerator
+from src.report_generator import ReportGenerator, is_latest_up_to_date
+from src.cache import clean_hist_cache
 from src.config import get_china_now, is_trading_day
 
 # 配置日志
@@ -37,6 +38,11 @@ def main():
         action='store_true',
         help='清理30天前的历史数据'
     )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='忽略已有的今日收盘后结果，重新分析'
+    )
     
     args = parser.parse_args()
     
@@ -51,6 +57,11 @@ def main():
         logger.info("今天不是交易日，跳过更新")
         return 0
     
+    # 今日收盘后已生成过相同模式的结果，数据不会再变化
+    if not args.refresh and is_latest_up_to_date(args.mode):
+        logger.info("已有今日收盘后的分析结果（缓存命中），跳过更新")
+        return 0
+    
     try:
         # 选择分析器
         if args.mode == 'full':
@@ -75,6 +86,7 @@ def main():
         if args.clean:
             logger.info("清理旧历史数据...")
             generator.clean_old_history(keep_days=30)
+            clean_hist_cache()
         
         if success:
             logger.info("=" * 50)
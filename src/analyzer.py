@@ -4,24 +4,163 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
-import json
 import logging
-import akshare as ak
-import time
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .config import (
     ANALYSIS_PERIODS,
     TOP_N,
-    ANALYSIS_DIR,
+    FETCH_WORKERS,
     get_china_now,
+    get_today_str,
+    get_previous_trading_day_str,
+    is_trading_day,
     EXCLUDE_ST,
     MIN_PRICE
 )
+from .cache import HistWindow, get_hist, make_hist_window
+from .data_fetcher import get_realtime_spot
+from .http_session import install_shared_session
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+install_shared_session()
+
+# 实时行情列名映射
+_REALTIME_COLUMNS = {
+    '代码': 'symbol',
+    '名称': 'name',
+    '最新价': 'price',
+    '涨跌幅': 'pct_change',
+    '涨跌额': 'change_amount',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '振幅': 'amplitude',
+    '最高': 'high',
+    '最低': 'low',
+    '今开': 'open',
+    '昨收': 'pre_close',
+    '换手率': 'turnover',
+    '市盈率-动态': 'pe',
+    '市净率': 'pb',
+    '总市值': 'market_cap',
+    '流通市值': 'float_market_cap',
+    '涨速': 'change_speed',
+    '5分钟涨跌': 'change_5min',
+    '60日涨跌幅': 'change_60d',
+    '年初至今涨跌幅': 'change_ytd'
+}
+
+# ST及退市股票名称匹配
+_ST_RE = re.compile(r'ST|退|\*')
+
+# 历史数据请求为网络IO密集型，使用线程池并发获取
+_EXECUTOR = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+
+def _fetch_closes(
+    symbol: str,
+    window: HistWindow,
+    quote: Tuple[float, float]
+) -> Optional[np.ndarray]:
+    """获取单只股票历史收盘价（仅请求一次，供所有周期共用），失败返回None"""
+    try:
+        hist_df = get_hist(symbol, window, quote)
+    except Exception:
+        return None
+    
+    if hist_df is None or hist_df.empty:
+        return None
+    
+    return hist_df['收盘'].to_numpy(dtype=np.float32)
+
+
+def _build_close_matrix(close_list: List[np.ndarray]) -> np.ndarray:
+    """将长度不一的收盘价序列右对齐堆叠为矩阵，历史不足的部分填充NaN"""
+    max_days = max(max(len(c) for c in close_list), max(ANALYSIS_PERIODS) + 1)
+    # float32精度足以保留两位小数的涨跌幅，内存带宽减半
+    closes = np.full((len(close_list), max_days), np.nan, dtype=np.float32)
+    for i, c in enumerate(close_list):
+        closes[i, -len(c):] = c
+    return closes
+
+
+def _fetch_close_matrix(
+    symbols: List[str],
+    prices: np.ndarray,
+    pre_closes: np.ndarray
+) -> Tuple[List[str], np.ndarray]:
+    """
+    并发获取所有股票的历史收盘价
+    
+    交易日内，上一交易日已缓存且未除权的股票直接用实时快照的最新价补上今天，
+    只有其余股票才逐只请求历史数据
+    
+    Args:
+        symbols: 股票代码列表
+        prices: 与 symbols 对齐的实时最新价
+        pre_closes: 与 symbols 对齐的实时昨收价
+    
+    Returns:
+        (获取成功的股票代码列表, 与之逐行对应的收盘价矩阵)
+    """
+    # 日期参数在循环外计算一次，所有股票共用
+    prev_date = get_previous_trading_day_str() if is_trading_day() else None
+    window = make_hist_window(get_today_str(), prev_date)
+    total = len(symbols)
+    
+    logger.info(f"开始获取 {total} 只股票的历史数据...")
+    
+    futures = {
+        _EXECUTOR.submit(_fetch_closes, symbol, window, (price, pre_close)): symbol
+        for symbol, price, pre_close in zip(symbols, prices.tolist(), pre_closes.tolist())
+    }
+    
+    for idx, _ in enumerate(as_completed(futures), 1):
+        if idx % 200 == 0:
+            logger.info(f"进度: {idx}/{total}")
+    
+    # 按提交顺序（即行情快照顺序）收集结果，保证并列时的排行稳定可复现
+    fetched = {}
+    for future, symbol in futures.items():
+        closes = future.result()
+        if closes is not None and len(closes) > 0:
+            fetched[symbol] = closes
+    
+    if not fetched:
+        return [], np.empty((0, max(ANALYSIS_PERIODS) + 1), dtype=np.float32)
+    
+    return list(fetched), _build_close_matrix(list(fetched.values()))
+
+
+def _compute_period_returns(closes: np.ndarray) -> np.ndarray:
+    """
+    对收盘价矩阵一次性计算所有分析周期的区间涨跌幅
+    
+    Returns:
+        (股票数, 周期数) 矩阵，列顺序同 ANALYSIS_PERIODS，历史不足的股票为NaN
+    """
+    start_cols = [-(period + 1) for period in ANALYSIS_PERIODS]
+    return (closes[:, -1:] / closes[:, start_cols] - 1) * 100
+
+
+def _top_n_indices(values: np.ndarray, n: int, largest: bool = True) -> np.ndarray:
+    """
+    取最大（或最小）的n个元素下标，按值排序，值相同时按原始顺序（与 nlargest keep='first' 一致）
+    
+    argpartition为O(n)，只对选出的候选元素排序；第n名存在并列时，
+    把所有等于边界值的元素加回候选集，避免argpartition任意截取
+    """
+    keys = -values if largest else values
+    if n < len(keys):
+        boundary = keys[np.argpartition(keys, n - 1)[n - 1]]
+        idx = np.flatnonzero(keys <= boundary)
+    else:
+        idx = np.arange(len(keys))
+    return idx[np.lexsort((idx, keys[idx]))][:n]
+
 
 class StockAnalyzer:
     """股票分析器"""
@@ -48,75 +187,55 @@ class StockAnalyzer:
         result = {
             "update_time": get_china_now().strftime('%Y-%m-%d %H:%M:%S'),
             "analysis_date": self.analysis_date,
+            "mode": "full",
             "periods": {}
         }
         
         # 获取实时行情作为基础数据
         try:
-            realtime_df = ak.stock_zh_a_spot_em()
+            realtime_df = get_realtime_spot()
             realtime_df = self._preprocess_realtime_data(realtime_df)
         except Exception as e:
             logger.error(f"获取实时行情失败: {e}")
             return result
         
+        # 每只股票只获取一次历史数据，堆叠为收盘价矩阵供所有周期共用
+        symbols, closes = _fetch_close_matrix(
+            realtime_df['symbol'].tolist(),
+            realtime_df['price'].to_numpy(dtype=np.float64),
+            realtime_df['pre_close'].to_numpy(dtype=np.float64)
+        )
+        period_returns = _compute_period_returns(closes)
+        
         # 分析各个周期
-        for period in ANALYSIS_PERIODS:
+        for col, period in enumerate(ANALYSIS_PERIODS):
             logger.info(f"分析 {period} 日涨跌排行...")
-            period_result = self._analyze_single_period(realtime_df, period)
+            period_result = self._analyze_single_period(realtime_df, period, symbols, period_returns[:, col])
             result["periods"][f"{period}d"] = period_result
         
         # 添加市场概况
         result["market_overview"] = self._get_market_overview(realtime_df)
         
-        # 保存分析结果
-        self._save_analysis_result(result)
-        
         return result
     
     def _preprocess_realtime_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """预处理实时数据"""
         # 重命名列
-        column_mapping = {
-            '代码': 'symbol',
-            '名称': 'name',
-            '最新价': 'price',
-            '涨跌幅': 'pct_change',
-            '涨跌额': 'change_amount',
-            '成交量': 'volume',
-            '成交额': 'amount',
-            '振幅': 'amplitude',
-            '最高': 'high',
-            '最低': 'low',
-            '今开': 'open',
-            '昨收': 'pre_close',
-            '换手率': 'turnover',
-            '市盈率-动态': 'pe',
-            '市净率': 'pb',
-            '总市值': 'market_cap',
-            '流通市值': 'float_market_cap',
-            '涨速': 'change_speed',
-            '5分钟涨跌': 'change_5min',
-            '60日涨跌幅': 'change_60d',
-            '年初至今涨跌幅': 'change_ytd'
-        }
+        df = df.rename(columns=_REALTIME_COLUMNS)
         
-        df = df.rename(columns=column_mapping)
-        
-        # 过滤无效数据
-        df = df[df['price'].notna() & (df['price'] > 0)]
+        # 合并所有过滤条件为一个掩码，只做一次切片
+        mask = (
+            df['price'].notna() & (df['price'] > 0)  # 过滤无效数据
+            & (df['price'] >= MIN_PRICE)  # 过滤低价股
+            & (df['volume'] > 0)  # 过滤停牌
+            & df['pct_change'].between(-11, 11, inclusive='neither')  # 过滤涨跌停（新股等）
+        )
         
         # 过滤ST
         if EXCLUDE_ST:
-            df = df[~df['name'].str.contains('ST|退|\*', na=False, regex=True)]
-        
-        # 过滤低价股
-        df = df[df['price'] >= MIN_PRICE]
+            mask &= ~df['name'].str.contains(_ST_RE, na=False)
         
-        # 过滤停牌
-        df = df[df['volume'] > 0]
-        
-        # 过滤涨跌停（新股等）
-        df = df[(df['pct_change'] > -11) & (df['pct_change'] < 11)]
+        df = df.loc[mask].reset_index(drop=True)
         
         logger.info(f"预处理后剩余 {len(df)} 只股票")
         
@@ -125,7 +244,9 @@ class StockAnalyzer:
     def _analyze_single_period(
         self, 
         base_df: pd.DataFrame, 
-        period: int
+        period: int,
+        symbols: List[str],
+        returns: np.ndarray
     ) -> Dict:
         """分析单个周期的涨跌排行"""
         
@@ -136,105 +257,83 @@ class StockAnalyzer:
             "statistics": {}
         }
         
-        # 获取历史数据计算区间涨跌幅
-        stock_changes = []
-        
-        symbols = base_df['symbol'].tolist()
-        total = len(symbols)
-        
-        logger.info(f"开始计算 {total} 只股票的 {period} 日涨跌幅...")
+        # 剔除历史不足的股票
+        valid = ~np.isnan(returns)
         
-        for idx, symbol in enumerate(symbols):
-            if idx % 200 == 0 and idx > 0:
-                logger.info(f"进度: {idx}/{total}")
-            
-            try:
-                # 获取历史数据
-                hist_df = ak.stock_zh_a_hist(
-                    symbol=symbol,
-                    period="daily",
-                    start_date=(get_china_now() - timedelta(days=period + 10)).strftime('%Y%m%d'),
-                    end_date=get_china_now().strftime('%Y%m%d'),
-                    adjust="qfq"
-                )
-                
-                if hist_df is None or len(hist_df) < period:
-                    continue
-                
-                # 计算区间涨跌幅
-                closes = hist_df['收盘'].values
-                if len(closes) >= period + 1:
-                    start_price = closes[-(period + 1)]
-                    end_price = closes[-1]
-                    period_change = (end_price - start_price) / start_price * 100
-                    
-                    stock_info = base_df[base_df['symbol'] == symbol].iloc[0]
-                    
-                    stock_changes.append({
-                        'symbol': symbol,
-                        'name': stock_info['name'],
-                        'price': float(stock_info['price']),
-                        'period_change': round(period_change, 2),
-                        'today_change': float(stock_info['pct_change']),
-                        'turnover': float(stock_info['turnover']) if pd.notna(stock_info['turnover']) else 0,
-                        'market_cap': float(stock_info['market_cap']) / 100000000 if pd.notna(stock_info['market_cap']) else 0  # 转为亿
-                    })
-                    
-            except Exception as e:
-                continue
-            
-            # 控制请求频率
-            time.sleep(0.02)
-        
-        if not stock_changes:
+        if not valid.any():
             return result
         
-        # 转换为DataFrame进行排序
-        changes_df = pd.DataFrame(stock_changes)
+        valid_symbols = np.asarray(symbols)[valid]
+        # 转回float64再取整，避免float32的尾数误差写入结果
+        returns = np.round(returns[valid].astype(np.float64), 2)
+        
+        # 与有效股票逐行对齐的行情字段
+        info = base_df.set_index('symbol').reindex(valid_symbols)
+        names = info['name'].to_numpy()
+        prices = info['price'].to_numpy(dtype=np.float64)
+        today_changes = info['pct_change'].to_numpy(dtype=np.float64)
+        turnovers = np.nan_to_num(info['turnover'].to_numpy(dtype=np.float64))
+        market_caps = np.nan_to_num(info['market_cap'].to_numpy(dtype=np.float64)) / 100000000  # 转为亿
+        
+        def to_records(indices: np.ndarray) -> List[Dict]:
+            """只将排行榜上的股票转换为字典"""
+            return [
+                {
+                    'symbol': symbol,
+                    'name': name,
+                    'price': price,
+                    'period_change': period_change,
+                    'today_change': today_change,
+                    'turnover': turnover,
+                    'market_cap': market_cap
+                }
+                for symbol, name, price, period_change, today_change, turnover, market_cap in zip(
+                    valid_symbols[indices].tolist(),
+                    names[indices].tolist(),
+                    prices[indices].tolist(),
+                    returns[indices].tolist(),
+                    today_changes[indices].tolist(),
+                    turnovers[indices].tolist(),
+                    market_caps[indices].tolist()
+                )
+            ]
         
-        # 获取涨幅TOP10
-        top_gainers = changes_df.nlargest(TOP_N, 'period_change')
-        result['gainers'] = top_gainers.to_dict('records')
+        # 获取涨幅TOP N
+        result['gainers'] = to_records(_top_n_indices(returns, TOP_N))
         
-        # 获取跌幅TOP10
-        top_losers = changes_df.nsmallest(TOP_N, 'period_change')
-        result['losers'] = top_losers.to_dict('records')
+        # 获取跌幅TOP N
+        result['losers'] = to_records(_top_n_indices(returns, TOP_N, largest=False))
         
         # 统计信息
+        up_count = int((returns > 0).sum())
         result['statistics'] = {
-            'total_stocks': len(changes_df),
-            'avg_change': round(changes_df['period_change'].mean(), 2),
-            'median_change': round(changes_df['period_change'].median(), 2),
-            'up_count': int((changes_df['period_change'] > 0).sum()),
-            'down_count': int((changes_df['period_change'] < 0).sum()),
-            'up_ratio': round((changes_df['period_change'] > 0).sum() / len(changes_df) * 100, 2)
+            'total_stocks': int(returns.size),
+            'avg_change': round(float(returns.mean()), 2),
+            'median_change': round(float(np.median(returns)), 2),
+            'up_count': up_count,
+            'down_count': int((returns < 0).sum()),
+            'up_ratio': round(up_count / returns.size * 100, 2)
         }
         
         return result
     
     def _get_market_overview(self, df: pd.DataFrame) -> Dict:
         """获取市场概况"""
+        # 取出一次numpy数组复用，避免每项统计重新构造布尔Series
+        pc = df['pct_change'].to_numpy(dtype=np.float64)
+        up = int((pc > 0).sum())
+        down = int((pc < 0).sum())
+        
         return {
-            'total_stocks': len(df),
-            'up_stocks': int((df['pct_change'] > 0).sum()),
-            'down_stocks': int((df['pct_change'] < 0).sum()),
-            'flat_stocks': int((df['pct_change'] == 0).sum()),
-            'limit_up': int((df['pct_change'] >= 9.9).sum()),
-            'limit_down': int((df['pct_change'] <= -9.9).sum()),
-            'avg_change': round(df['pct_change'].mean(), 2),
-            'total_amount': round(df['amount'].sum() / 100000000, 2)  # 亿元
+            'total_stocks': int(pc.size),
+            'up_stocks': up,
+            'down_stocks': down,
+            'flat_stocks': int(pc.size) - up - down,
+            'limit_up': int((pc >= 9.9).sum()),
+            'limit_down': int((pc <= -9.9).sum()),
+            'avg_change': round(float(pc.mean()), 2) if pc.size else 0,
+            'total_amount': round(float(np.nansum(df['amount'].to_numpy(dtype=np.float64))) / 100000000, 2)  # 亿元
         }
-    
-    def _save_analysis_result(self, result: Dict):
-        """保存分析结果"""
-        # 保存到analysis目录
-        filename = f"analysis_{self.analysis_date}.json"
-        filepath = ANALYSIS_DIR / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"分析结果已保存到: {filepath}")
 
 
 class SimplifiedAnalyzer:
@@ -253,22 +352,32 @@ class SimplifiedAnalyzer:
         result = {
             "update_time": get_china_now().strftime('%Y-%m-%d %H:%M:%S'),
             "analysis_date": self.analysis_date,
+            "mode": "quick",
             "periods": {},
             "market_overview": {}
         }
         
         try:
             # 获取实时行情
-            df = ak.stock_zh_a_spot_em()
+            df = get_realtime_spot()
             df = self._filter_stocks(df)
             
             # 获取市场概况
             result["market_overview"] = self._calc_market_overview(df)
             
-            # 对于不同周期，我们采样计算
-            for period in ANALYSIS_PERIODS:
+            # 随机采样一次以减少API调用，所有周期共用同一批股票的收盘价矩阵
+            sample_size = min(300, len(df))
+            sample_df = df.sample(n=sample_size, random_state=42)
+            symbols, closes = _fetch_close_matrix(
+                sample_df['代码'].tolist(),
+                sample_df['最新价'].to_numpy(dtype=np.float64),
+                sample_df['昨收'].to_numpy(dtype=np.float64)
+            )
+            period_returns = _compute_period_returns(closes)
+            
+            for col, period in enumerate(ANALYSIS_PERIODS):
                 logger.info(f"快速分析 {period} 日数据...")
-                result["periods"][f"{period}d"] = self._quick_period_analysis(df, period)
+                result["periods"][f"{period}d"] = self._quick_period_analysis(sample_df, symbols, period_returns[:, col])
                 
         except Exception as e:
             logger.error(f"快速分析失败: {e}")
@@ -285,70 +394,70 @@ class SimplifiedAnalyzer:
     
     def _calc_market_overview(self, df: pd.DataFrame) -> Dict:
         """计算市场概况"""
+        pc = df['涨跌幅'].to_numpy(dtype=np.float64)
+        
         return {
-            'total_stocks': len(df),
-            'up_stocks': int((df['涨跌幅'] > 0).sum()),
-            'down_stocks': int((df['涨跌幅'] < 0).sum()),
-            'limit_up': int((df['涨跌幅'] >= 9.9).sum()),
-            'limit_down': int((df['涨跌幅'] <= -9.9).sum()),
-            'avg_change': round(df['涨跌幅'].mean(), 2),
-            'total_amount': round(df['成交额'].sum() / 100000000, 2)
+            'total_stocks': int(pc.size),
+            'up_stocks': int((pc > 0).sum()),
+            'down_stocks': int((pc < 0).sum()),
+            'limit_up': int((pc >= 9.9).sum()),
+            'limit_down': int((pc <= -9.9).sum()),
+            'avg_change': round(float(pc.mean()), 2) if pc.size else 0,
+            'total_amount': round(float(np.nansum(df['成交额'].to_numpy(dtype=np.float64))) / 100000000, 2)
         }
     
-    def _quick_period_analysis(self, base_df: pd.DataFrame, period: int) -> Dict:
+    def _quick_period_analysis(
+        self,
+        sample_df: pd.DataFrame,
+        symbols: List[str],
+        returns: np.ndarray
+    ) -> Dict:
         """
         快速周期分析
-        采样200只股票进行分析
+        基于采样股票的区间涨跌幅排行
         """
-        # 随机采样以减少API调用
-        sample_size = min(300, len(base_df))
-        sample_df = base_df.sample(n=sample_size, random_state=42)
-        
-        stock_changes = []
-        
-        for _, row in sample_df.iterrows():
-            symbol = row['代码']
-            try:
-                hist = ak.stock_zh_a_hist(
-                    symbol=symbol,
-                    period="daily",
-                    start_date=(get_china_now() - timedelta(days=period + 10)).strftime('%Y%m%d'),
-                    end_date=get_china_now().strftime('%Y%m%d'),
-                    adjust="qfq"
-                )
-                
-                if hist is None or len(hist) < period:
-                    continue
-                
-                closes = hist['收盘'].values
-                if len(closes) >= period + 1:
-                    change = (closes[-1] - closes[-(period+1)]) / closes[-(period+1)] * 100
-                    
-                    stock_changes.append({
-                        'symbol': symbol,
-                        'name': row['名称'],
-                        'price': float(row['最新价']),
-                        'period_change': round(change, 2),
-                        'today_change': float(row['涨跌幅']),
-                        'market_cap': round(float(row['总市值']) / 100000000, 2) if pd.notna(row['总市值']) else 0
-                    })
-                    
-            except:
-                continue
-            
-            time.sleep(0.03)
+        valid = ~np.isnan(returns)
         
-        if not stock_changes:
+        if not valid.any():
             return {'gainers': [], 'losers': [], 'statistics': {}}
         
-        changes_df = pd.DataFrame(stock_changes)
+        valid_symbols = np.asarray(symbols)[valid]
+        returns = np.round(returns[valid].astype(np.float64), 2)
+        
+        # 与有效股票逐行对齐的行情字段
+        info = sample_df.set_index('代码').reindex(valid_symbols)
+        names = info['名称'].to_numpy()
+        prices = info['最新价'].to_numpy(dtype=np.float64)
+        today_changes = info['涨跌幅'].to_numpy(dtype=np.float64)
+        market_caps = np.round(np.nan_to_num(info['总市值'].to_numpy(dtype=np.float64)) / 100000000, 2)
+        
+        def to_records(indices: np.ndarray) -> List[Dict]:
+            """只将排行榜上的股票转换为字典"""
+            return [
+                {
+                    'symbol': symbol,
+                    'name': name,
+                    'price': price,
+                    'period_change': period_change,
+                    'today_change': today_change,
+                    'market_cap': market_cap
+                }
+                for symbol, name, price, period_change, today_change, market_cap in zip(
+                    valid_symbols[indices].tolist(),
+                    names[indices].tolist(),
+                    prices[indices].tolist(),
+                    returns[indices].tolist(),
+                    today_changes[indices].tolist(),
+                    market_caps[indices].tolist()
+                )
+            ]
         
         return {
-            'gainers': changes_df.nlargest(TOP_N, 'period_change').to_dict('records'),
-            'losers': changes_df.nsmallest(TOP_N, 'period_change').to_dict('records'),
+            'gainers': to_records(_top_n_indices(returns, TOP_N)),
+            'losers': to_records(_top_n_indices(returns, TOP_N, largest=False)),
             'statistics': {
-                'sample_size': len(changes_df),
-                'avg_change': round(changes_df['period_change'].mean(), 2),
-                'up_ratio': round((changes_df['period_change'] > 0).sum() / len(changes_df) * 100, 2)
+                'sample_size': int(returns.size),
+                'avg_change': round(float(returns.mean()), 2),
+                'up_ratio': round(int((returns > 0).sum()) / returns.size * 100, 2)
             }
         }
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+缓存模块 - 将个股历史日线数据缓存到磁盘，避免重复请求
+"""
+import os
+import shutil
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from .config import (
+    HIST_CACHE_DIR,
+    HIST_LOOKBACK_DAYS,
+    MARKET_CLOSE_HOUR,
+    CHINA_TZ,
+    get_china_now
+)
+from .http_session import call_with_retry
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_path(symbol: str, end_date: str):
+    """缓存文件路径: data/cache/<end_date>/<symbol>.pkl"""
+    return HIST_CACHE_DIR / end_date / f"{symbol}.pkl"
+
+
+class HistWindow(NamedTuple):
+    """一次批量获取共用的日期参数，在逐只股票的循环外计算一次"""
+    end_date: str  # 截止日期 YYYYMMDD
+    start_date: str  # 请求起始日期 YYYYMMDD
+    end_day: date  # 截止日期
+    start_day: date  # 回溯起始日期，拼接后按此截取
+    close_ts: float  # 截止日收盘时刻的时间戳
+    prev_date: Optional[str]  # 上一交易日 YYYYMMDD，不拼接时为None
+    prev_close_ts: Optional[float]  # 上一交易日收盘时刻的时间戳
+
+
+def _close_timestamp(day: date) -> float:
+    """指定日期收盘时刻（中国时间）的时间戳"""
+    return CHINA_TZ.localize(
+        datetime(day.year, day.month, day.day, MARKET_CLOSE_HOUR)
+    ).timestamp()
+
+
+def make_hist_window(end_date: str, prev_date: Optional[str] = None) -> HistWindow:
+    """
+    计算一次批量获取所需的全部日期参数
+    
+    Args:
+        end_date: 截止日期，格式 YYYYMMDD
+        prev_date: 上一交易日，格式 YYYYMMDD；传入时允许用缓存与实时快照拼接
+    """
+    end_day = datetime.strptime(end_date, '%Y%m%d').date()
+    start_day = end_day - timedelta(days=HIST_LOOKBACK_DAYS)
+    prev_close_ts = None
+    if prev_date is not None:
+        prev_close_ts = _close_timestamp(datetime.strptime(prev_date, '%Y%m%d').date())
+    
+    return HistWindow(
+        end_date=end_date,
+        start_date=start_day.strftime('%Y%m%d'),
+        end_day=end_day,
+        start_day=start_day,
+        close_ts=_close_timestamp(end_day),
+        prev_date=prev_date,
+        prev_close_ts=prev_close_ts
+    )
+
+
+def _is_fresh(path, close_ts: float) -> bool:
+    """
+    判断缓存是否有效
+    
+    只有在截止日收盘后写入的缓存才完整，此后数据不会再变化
+    """
+    try:
+        return path.stat().st_mtime >= close_ts
+    except FileNotFoundError:
+        return False
+
+
+def _date_value(dates: pd.Series, day: date):
+    """把日期转换为与akshare日期列相同的类型（字符串、date或datetime64），比较时无需逐行解析"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return pd.Timestamp(day)
+    if len(dates) and isinstance(dates.iloc[-1], str):
+        return day.isoformat()
+    return day
+
+
+def _read_cache(path) -> Optional[pd.DataFrame]:
+    """读取缓存文件，文件损坏或不兼容（如pandas升级）时返回None，由调用方重新请求"""
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        logger.debug(f"读取缓存失败 {path}: {e}")
+        return None
+
+
+def _write_cache(path, hist_df: pd.DataFrame):
+    """先写临时文件再替换，避免并发读到不完整的文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    hist_df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _extend_with_quote(
+    symbol: str,
+    window: HistWindow,
+    price: float,
+    pre_close: float
+) -> Optional[pd.DataFrame]:
+    """
+    用上一交易日的缓存加上实时快照中的最新价拼出截至 end_date 的日线，不发起请求
+    
+    快照中的昨收是除权除息后的参考价，与缓存中最后一个前复权收盘价不一致时
+    说明发生了除权除息（前复权序列需要整体重算），返回None由调用方逐只请求
+    """
+    if pd.isna(price) or pd.isna(pre_close):
+        return None
+    
+    prev_path = _cache_path(symbol, window.prev_date)
+    if not _is_fresh(prev_path, window.prev_close_ts):
+        return None
+    
+    prev_df = _read_cache(prev_path)
+    if prev_df is None or prev_df.empty or abs(float(prev_df['收盘'].iloc[-1]) - pre_close) > 0.005:
+        return None
+    
+    dates = prev_df['日期']
+    today_row = pd.DataFrame({
+        '日期': [_date_value(dates, window.end_day)],
+        '收盘': [price]
+    })
+    hist_df = pd.concat([prev_df, today_row], ignore_index=True)
+    
+    # 保持与直接请求相同的回溯跨度，避免逐日拼接后序列无限增长
+    keep = hist_df['日期'] >= _date_value(dates, window.start_day)
+    return hist_df[keep].reset_index(drop=True)
+
+
+def get_hist(
+    symbol: str,
+    window: HistWindow,
+    quote: Optional[Tuple[float, float]] = None
+) -> pd.DataFrame:
+    """
+    获取个股前复权日线数据（带磁盘缓存）
+    
+    未命中时优先用上一交易日缓存与实时快照拼接；无法拼接时按
+    HIST_LOOKBACK_DAYS 的跨度请求一次并缓存，所有周期共用同一份数据
+    
+    Args:
+        symbol: 股票代码
+        window: make_hist_window 预先计算的日期参数
+        quote: 可选的 (最新价, 昨收)，来自实时行情快照，仅在 window 含上一交易日时使用
+        
+    Returns:
+        akshare 原始列名的 DataFrame，请求失败时抛出异常
+    """
+    path = _cache_path(symbol, window.end_date)
+    
+    hist_df = _read_cache(path) if _is_fresh(path, window.close_ts) else None
+    if hist_df is not None:
+        return hist_df
+    
+    if quote is not None and window.prev_date is not None:
+        hist_df = _extend_with_quote(symbol, window, *quote)
+    
+    if hist_df is None:
+        hist_df = call_with_retry(
+            ak.stock_zh_a_hist,
+            symbol=symbol,
+            period="daily",
+            start_date=window.start_date,
+            end_date=window.end_date,
+            adjust="qfq"
+        )
+        if hist_df is None:
+            return pd.DataFrame()
+    
+    # 与 _is_fresh 同一规则：收盘前写入的缓存永远不会被读取，不必落盘
+    if time.time() >= window.close_ts:
+        _write_cache(path, hist_df)
+    return hist_df
+
+
+def clean_hist_cache(keep_days: int = 7):
+    """
+    清理过期的历史数据缓存
+    
+    Args:
+        keep_days: 保留最近多少天的缓存
+    """
+    cutoff = (get_china_now() - timedelta(days=keep_days)).strftime('%Y%m%d')
+    
+    for dir_path in HIST_CACHE_DIR.iterdir():
+        if dir_path.is_dir() and dir_path.name < cutoff:
+            shutil.rmtree(dir_path, ignore_errors=True)
+            logger.info(f"🗑️ 已删除过期缓存: {dir_path.name}")
@@ -2,24 +2,41 @@
 配置模块 - 集中管理所有配置项
 """
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from typing import Optional
 import pytz
+from chinese_calendar import is_holiday
 
 # 路径配置
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 DAILY_DATA_DIR = DATA_DIR / "daily"
 ANALYSIS_DIR = DATA_DIR / "analysis"
+HIST_CACHE_DIR = DATA_DIR / "cache"
 DOCS_DIR = BASE_DIR / "docs"
 DOCS_DATA_DIR = DOCS_DIR / "data"
 
 # 确保目录存在
-for dir_path in [DAILY_DATA_DIR, ANALYSIS_DIR, DOCS_DATA_DIR]:
+for dir_path in [DAILY_DATA_DIR, ANALYSIS_DIR, HIST_CACHE_DIR, DOCS_DATA_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 # 分析配置
 ANALYSIS_PERIODS = [5, 10, 20]  # 分析周期（天）
 TOP_N = 50  # 排行榜数量
+HIST_LOOKBACK_DAYS = max(ANALYSIS_PERIODS) + 10  # 历史数据获取的自然日跨度
+
+# 收盘时间（收盘后当日历史数据不再变化）
+MARKET_CLOSE_HOUR = 15
+
+# 并发配置
+FETCH_WORKERS = 24  # 历史数据并发请求线程数
+HTTP_POOL_CONNECTIONS = 32  # 缓存连接池的主机数
+HTTP_POOL_SIZE = 64  # 单个主机的HTTP连接池大小（需不小于并发线程数）
+HTTP_MAX_RETRIES = 3  # 连接失败重试次数
+FETCH_RETRIES = 3  # 接口请求失败（如被限流）的最大尝试次数
+FETCH_RETRY_BASE_DELAY = 0.1  # 指数退避初始等待（秒）
+FETCH_RETRY_MAX_DELAY = 2.0  # 指数退避最长等待（秒）
+REALTIME_CACHE_TTL = 60  # 实时行情缓存有效期（秒）
 
 # 时区配置
 CHINA_TZ = pytz.timezone('Asia/Shanghai')
@@ -34,7 +51,30 @@ def get_china_now():
     """获取当前中国时间"""
     return datetime.now(CHINA_TZ)
 
-def is_trading_day():
-    """简单判断是否为交易日（周一到周五）"""
-    now = get_china_now()
-    return now.weekday() < 5
\ No newline at end of file
+def get_today_str() -> str:
+    """获取当前中国日期字符串（YYYYMMDD）"""
+    return get_china_now().strftime('%Y%m%d')
+
+def is_trading_day(day: Optional[date] = None):
+    """
+    判断指定日期（默认今天）是否为交易日
+    
+    周末休市（调休上班日同样休市），法定节假日按 chinese_calendar 判断；
+    日历未覆盖的年份退化为仅判断周一到周五
+    """
+    if day is None:
+        day = get_china_now().date()
+    if day.weekday() >= 5:
+        return False
+    
+    try:
+        return not is_holiday(day)
+    except NotImplementedError:
+        return True
+
+def get_previous_trading_day_str() -> str:
+    """获取今天之前最近一个交易日的日期字符串（YYYYMMDD）"""
+    day = get_china_now().date() - timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day.strftime('%Y%m%d')
\ No newline at end of file
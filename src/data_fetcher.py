@@ -6,9 +6,11 @@ import pandas as pd
 from datetime import datetime, timedelta
 import json
 import time
+import threading
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .config import (
     DAILY_DATA_DIR, 
@@ -16,12 +18,40 @@ from .config import (
     CHINA_TZ,
     EXCLUDE_ST,
     MIN_PRICE,
+    FETCH_WORKERS,
+    REALTIME_CACHE_TTL,
     get_china_now
 )
+from .http_session import install_shared_session, call_with_retry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+install_shared_session()
+
+# 历史数据请求为网络IO密集型，使用线程池并发获取
+_EXECUTOR = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+# 实时行情缓存: (获取时刻, DataFrame)
+_realtime_cache: Optional[Tuple[float, pd.DataFrame]] = None
+_realtime_lock = threading.Lock()
+
+
+def get_realtime_spot() -> pd.DataFrame:
+    """
+    获取A股实时行情（akshare原始列名）
+    
+    REALTIME_CACHE_TTL 秒内复用同一份数据，避免同一次运行中重复请求全市场快照；
+    返回的DataFrame为共享对象，调用方不要原地修改
+    """
+    global _realtime_cache
+    
+    with _realtime_lock:
+        now = time.monotonic()
+        if _realtime_cache is None or now - _realtime_cache[0] > REALTIME_CACHE_TTL:
+            _realtime_cache = (now, call_with_retry(ak.stock_zh_a_spot_em))
+        return _realtime_cache[1]
+
 
 class StockDataFetcher:
     """A股数据获取器"""
@@ -57,11 +87,13 @@ class StockDataFetcher:
         """
         try:
             # 计算日期范围
-            end_date = get_china_now().strftime('%Y%m%d')
-            start_date = (get_china_now() - timedelta(days=days + 30)).strftime('%Y%m%d')
+            now = get_china_now()
+            end_date = now.strftime('%Y%m%d')
+            start_date = (now - timedelta(days=days + 30)).strftime('%Y%m%d')
             
             # 使用akshare获取数据
-            df = ak.stock_zh_a_hist(
+            df = call_with_retry(
+                ak.stock_zh_a_hist,
                 symbol=symbol,
                 period="daily",
                 start_date=start_date,
@@ -98,7 +130,7 @@ class StockDataFetcher:
         """获取实时行情数据（用于快速获取当日数据）"""
         try:
             # 获取A股实时行情
-            df = ak.stock_zh_a_spot_em()
+            df = get_realtime_spot()
             
             # 标准化列名
             df = df.rename(columns={
@@ -201,40 +233,35 @@ class StockDataFetcher:
             result_list = []
             total = len(df)
             
-            for idx, row in df.iterrows():
-                symbol = row['symbol']
-                
+            futures = {
+                _EXECUTOR.submit(self.get_stock_daily_data, row['symbol'], period + 5): row
+                for _, row in df.iterrows()
+            }
+            
+            for idx, future in enumerate(as_completed(futures), 1):
                 if idx % 100 == 0:
                     logger.info(f"处理进度: {idx}/{total}")
                 
-                try:
-                    # 获取历史数据
-                    hist_df = self.get_stock_daily_data(symbol, period + 5)
-                    
-                    if hist_df is None or len(hist_df) < period:
-                        continue
-                    
-                    # 计算区间涨跌幅
-                    close_prices = hist_df['close'].values
-                    if len(close_prices) >= period:
-                        period_start_price = close_prices[-(period+1)] if len(close_prices) > period else close_prices[0]
-                        period_end_price = close_prices[-1]
-                        period_change = (period_end_price - period_start_price) / period_start_price * 100
-                        
-                        result_list.append({
-                            'symbol': symbol,
-                            'name': row['name'],
-                            'price': row['price'],
-                            'period_change': round(period_change, 2),
-                            'market_cap': row.get('market_cap', 0),
-                            'turnover': row.get('turnover', 0)
-                        })
-                        
-                except Exception as e:
+                row = futures[future]
+                hist_df = future.result()
+                
+                if hist_df is None or len(hist_df) < period:
                     continue
                 
-                # 避免请求过快
-                time.sleep(0.05)
+                # 计算区间涨跌幅
+                close_prices = hist_df['close'].values
+                period_start_price = close_prices[-(period+1)] if len(close_prices) > period else close_prices[0]
+                period_end_price = close_prices[-1]
+                period_change = (period_end_price - period_start_price) / period_start_price * 100
+                
+                result_list.append({
+                    'symbol': row['symbol'],
+                    'name': row['name'],
+                    'price': row['price'],
+                    'period_change': round(period_change, 2),
+                    'market_cap': row.get('market_cap', 0),
+                    'turnover': row.get('turnover', 0)
+                })
             
             result_df = pd.DataFrame(result_list)
             return result_df
@@ -268,8 +295,6 @@ class FastDataFetcher:
                     'gainers': top_gainers,
                     'losers': top_losers
                 }
-                
-                time.sleep(0.5)
             
             return result
             
@@ -281,10 +306,7 @@ class FastDataFetcher:
         """获取涨幅排行"""
         try:
             # 使用akshare的排行榜接口
-            if period == 5:
-                df = ak.stock_zh_a_spot_em()
-            else:
-                df = ak.stock_zh_a_spot_em()
+            df = get_realtime_spot()
             
             # 这里需要根据实际接口调整
             # 简化处理：使用实时数据模拟
@@ -313,7 +335,7 @@ class FastDataFetcher:
     def _get_losers_ranking(self, period: int) -> List[Dict]:
         """获取跌幅排行"""
         try:
-            df = ak.stock_zh_a_spot_em()
+            df = get_realtime_spot()
             df = self._filter_valid_stocks(df)
             
             # 取跌幅前10
@@ -0,0 +1,60 @@
+"""
+HTTP会话模块 - 为akshare的HTTP请求提供带连接池的共享会话
+"""
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    FETCH_WORKERS,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_RETRIES,
+    FETCH_RETRIES,
+    FETCH_RETRY_BASE_DELAY,
+    FETCH_RETRY_MAX_DELAY
+)
+
+# 复用TCP/TLS连接，避免每次请求重新握手
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=max(HTTP_POOL_SIZE, FETCH_WORKERS),
+    max_retries=HTTP_MAX_RETRIES
+)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+
+def install_shared_session():
+    """
+    让akshare复用共享会话
+    
+    akshare内部直接调用 requests.get，没有暴露可替换的会话对象，
+    因此将模块级的 requests.get 替换为共享会话的 get 方法（可重复调用）
+    """
+    if getattr(requests.get, '_shared_session', False):
+        return
+    
+    def _get(url, params=None, **kwargs):
+        return _session.get(url, params=params, **kwargs)
+    
+    _get._shared_session = True
+    requests.get = _get
+
+
+def call_with_retry(func, *args, **kwargs):
+    """
+    调用接口，失败时按指数退避重试
+    
+    并发请求不再逐次sleep限速，偶发的限流（429）或连接中断由退避重试兜底，
+    最后一次仍失败时抛出原异常
+    """
+    for attempt in range(FETCH_RETRIES):
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt == FETCH_RETRIES - 1:
+                raise
+            time.sleep(min(FETCH_RETRY_BASE_DELAY * 2 ** attempt, FETCH_RETRY_MAX_DELAY))
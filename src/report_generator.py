@@ -1,17 +1,24 @@
 """
 报告生成模块 - 负责生成JSON数据文件供前端使用
 """
-import json
+import bisect
 from pathlib import Path
 from typing import Dict
 import logging
 
-from .config import DOCS_DATA_DIR, ANALYSIS_DIR, get_china_now
+import orjson
+
+from .config import DOCS_DATA_DIR, ANALYSIS_DIR, MARKET_CLOSE_HOUR, get_china_now
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _encode_json(data: Dict) -> bytes:
+    """将数据序列化为缩进两格的UTF-8 JSON（numpy类型可直接序列化）"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+
+
 class ReportGenerator:
     """报告生成器 - 生成前端所需的JSON数据文件"""
     
@@ -34,11 +41,15 @@ class ReportGenerator:
             是否成功
         """
         try:
+            # 只序列化一次，所有文件写入同一份内容
+            payload = _encode_json(analysis_result)
+            date_str = analysis_result.get('analysis_date', get_china_now().strftime('%Y-%m-%d'))
+            
             # 1. 保存为前端使用的最新数据
-            self._save_latest_data(analysis_result)
+            self._save_latest_data(payload)
             
             # 2. 保存历史存档
-            self._save_history_data(analysis_result)
+            self._save_history_data(payload, date_str)
             
             logger.info("✅ 报告生成完成")
             return True
@@ -47,36 +58,31 @@ class ReportGenerator:
             logger.error(f"❌ 生成报告失败: {e}")
             return False
     
-    def _save_latest_data(self, data: Dict):
+    def _save_latest_data(self, payload: bytes):
         """
         保存最新数据为JSON文件（供前端读取）
         文件路径: docs/data/latest.json
         """
         latest_path = DOCS_DATA_DIR / "latest.json"
         
-        with open(latest_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        latest_path.write_bytes(payload)
         
         logger.info(f"📄 最新数据已保存: {latest_path}")
     
-    def _save_history_data(self, data: Dict):
+    def _save_history_data(self, payload: bytes, date_str: str):
         """
         保存历史数据存档
         文件路径: 
           - docs/data/data_YYYY-MM-DD.json (供前端历史查询)
           - data/analysis/analysis_YYYY-MM-DD.json (本地存档)
         """
-        date_str = data.get('analysis_date', get_china_now().strftime('%Y-%m-%d'))
-        
         # 保存到 docs/data 目录（前端可访问）
         frontend_history_path = DOCS_DATA_DIR / f"data_{date_str}.json"
-        with open(frontend_history_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        frontend_history_path.write_bytes(payload)
         
         # 保存到 data/analysis 目录（本地存档）
         local_history_path = ANALYSIS_DIR / f"analysis_{date_str}.json"
-        with open(local_history_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        local_history_path.write_bytes(payload)
         
         logger.info(f"📚 历史数据已保存: {date_str}")
     
@@ -87,37 +93,31 @@ class ReportGenerator:
         Args:
             keep_days: 保留最近多少天的数据
         """
-        import os
-        from datetime import datetime, timedelta
+        from datetime import timedelta
         
-        cutoff_date = get_china_now() - timedelta(days=keep_days)
+        cutoff_str = (get_china_now() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
         
         # 清理 docs/data 目录
-        for file_path in DOCS_DATA_DIR.glob("data_*.json"):
-            try:
-                # 从文件名提取日期
-                date_str = file_path.stem.replace("data_", "")
-                file_date = datetime.strptime(date_str, "%Y-%m-%d")
-                
-                if file_date.date() < cutoff_date.date():
-                    file_path.unlink()
-                    logger.info(f"🗑️ 已删除旧文件: {file_path.name}")
-                    
-            except (ValueError, OSError) as e:
-                logger.warning(f"清理文件失败 {file_path}: {e}")
+        self._remove_files_before(DOCS_DATA_DIR, "data_", cutoff_str)
         
         # 清理 data/analysis 目录
-        for file_path in ANALYSIS_DIR.glob("analysis_*.json"):
+        self._remove_files_before(ANALYSIS_DIR, "analysis_", cutoff_str)
+    
+    def _remove_files_before(self, dir_path: Path, prefix: str, cutoff_str: str):
+        """
+        删除目录中日期早于截止日期的 <prefix>YYYY-MM-DD.json 文件
+        
+        文件名中的日期为ISO格式，字典序即日期序，排序后二分查找截止位置，无需逐个解析日期
+        """
+        names = sorted(p.name for p in dir_path.glob(f"{prefix}*.json"))
+        cutoff_idx = bisect.bisect_left(names, f"{prefix}{cutoff_str}.json")
+        
+        for name in names[:cutoff_idx]:
             try:
-                date_str = file_path.stem.replace("analysis_", "")
-                file_date = datetime.strptime(date_str, "%Y-%m-%d")
-                
-                if file_date.date() < cutoff_date.date():
-                    file_path.unlink()
-                    logger.info(f"🗑️ 已删除旧文件: {file_path.name}")
-                    
-            except (ValueError, OSError) as e:
-                logger.warning(f"清理文件失败 {file_path}: {e}")
+                (dir_path / name).unlink()
+                logger.info(f"🗑️ 已删除旧文件: {name}")
+            except OSError as e:
+                logger.warning(f"清理文件失败 {dir_path / name}: {e}")
 
 
 def get_available_history_dates() -> list:
@@ -127,16 +127,43 @@ def get_available_history_dates() -> list:
     Returns:
         日期字符串列表，按日期降序排列
     """
-    dates = []
+    # 按日期降序排列（ISO日期的字典序即日期序）
+    return sorted(
+        (file_path.stem[len("data_"):] for file_path in DOCS_DATA_DIR.glob("data_*.json")),
+        reverse=True
+    )
+
+
+def is_latest_up_to_date(mode: str) -> bool:
+    """
+    判断 docs/data/latest.json 是否已是今日收盘后以相同模式生成的结果
     
-    for file_path in DOCS_DATA_DIR.glob("data_*.json"):
-        try:
-            date_str = file_path.stem.replace("data_", "")
-            dates.append(date_str)
-        except:
-            continue
+    收盘后行情不再变化，重复运行只会得到相同的数据，可以直接跳过；
+    任一周期的涨幅榜为空说明上次运行不完整，需要重新分析
+    
+    Args:
+        mode: 运行模式（full/quick）
+    """
+    latest_path = DOCS_DATA_DIR / "latest.json"
+    if not latest_path.exists():
+        return False
+    
+    try:
+        data = orjson.loads(latest_path.read_bytes())
+    except (OSError, ValueError):
+        return False
+    
+    now = get_china_now()
+    today = now.strftime('%Y-%m-%d')
+    if data.get('analysis_date') != today or data.get('mode') != mode:
+        return False
     
-    # 按日期降序排列
-    dates.sort(reverse=True)
+    close_time = f"{today} {MARKET_CLOSE_HOUR:02d}:00:00"
+    if data.get('update_time', '') < close_time:
+        return False
     
-    return dates
\ No newline at end of file
+    # 历史数据全部获取失败时结果为空，不能视为有效缓存
+    periods = data.get('periods') or {}
+    return bool(periods) and all(
+        (period_data or {}).get('gainers') for period_data in periods.values()
+    )
\ No newline at end of file